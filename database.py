@@ -1,161 +1,295 @@
 import sqlite3
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Set, Tuple, AsyncIterator
+
+import aiosqlite
+from aiosqlitepool import SQLiteConnectionPool
+
+# метку времени ставит сам SQLite, без datetime на каждую строку
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+# один и тот же текст запроса во всех путях записи: sqlite3 находит его в кэше
+# подготовленных выражений соединения и не компилирует заново
+_INS_SENSOR = (f"INSERT INTO sensor_readings(session_id, sensor_type, timestamp, value, unit) "
+               f"VALUES (?,?,{_NOW},?,?)")
+_INS_CMD = (f"INSERT INTO actuator_commands(session_id, actuator_type, timestamp, command, status) "
+            f"VALUES (?,?,{_NOW},?,?)")
+_INS_EVENT = (f"INSERT INTO events(session_id, timestamp, event_type, severity, message) "
+              f"VALUES (?,{_NOW},?,?,?)")
 
 class TelemetryLogger:
-    def __init__(self, db_path: str = "robot_telemetry.db") -> None:
+    def __init__(self, db_path: str = "robot_telemetry.db", pool_size: int = 8) -> None:
         self.db_path = db_path
-        self._conn: Optional[sqlite3.Connection] = None
-
-    def connect(self) -> None:
-        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self._conn.execute("PRAGMA foreign_keys = ON;")
-        self._conn.row_factory = sqlite3.Row
-
-    def close(self) -> None:
-        if self._conn is not None:
-            self._conn.close()
-            self._conn = None
-
-    def init_schema(self) -> None:
-        assert self._conn is not None
-        cur = self._conn.cursor()
-        cur.executescript("""
-            CREATE TABLE IF NOT EXISTS sessions (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              started_at TEXT NOT NULL,
-              ended_at TEXT,
-              status TEXT NOT NULL CHECK(status IN ('running','completed','error'))
-            );
-
-            CREATE TABLE IF NOT EXISTS sensor_readings (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
-              sensor_type TEXT NOT NULL,
-              timestamp TEXT NOT NULL,
-              value REAL NOT NULL,
-              unit TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS actuator_commands (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
-              actuator_type TEXT NOT NULL,
-              timestamp TEXT NOT NULL,
-              command REAL NOT NULL,
-              status TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS events (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
-              timestamp TEXT NOT NULL,
-              event_type TEXT NOT NULL,
-              severity TEXT NOT NULL CHECK(severity IN ('info','warning','error')),
-              message TEXT NOT NULL
-            );
-        """)
-        self._conn.commit()
-
-    def create_session(self) -> int:
-        ts = datetime.utcnow().isoformat()
-        cur = self._conn.execute(
-            "INSERT INTO sessions(started_at, status) VALUES (?,?)",
-            (ts, "running")
-        )
-        self._conn.commit()
+        self.pool_size = pool_size
+        self._pool: Optional[SQLiteConnectionPool] = None
+        # id сессий со статусом running: проверка перед записью телеметрии без SELECT.
+        # Кэш свой у каждого процесса: сессии, завершённые другим воркером, он не видит
+        self._open_sessions: Set[int] = set()
+        # счётчик завершений: is_session_open по нему замечает end_session,
+        # прошедший, пока он ждал ответа БД
+        self._ended_count = 0
+
+    async def _connection_factory(self) -> aiosqlite.Connection:
+        # автокоммит: одиночные записи не держат неявных транзакций,
+        # пакеты явно оборачиваются в transaction()
+        conn = await aiosqlite.connect(self.db_path, isolation_level=None)
+        await conn.execute("PRAGMA foreign_keys = ON;")
+        await conn.execute("PRAGMA journal_mode = WAL;")
+        await conn.execute("PRAGMA synchronous = NORMAL;")
+        await conn.execute("PRAGMA temp_store = MEMORY;")
+        await conn.execute("PRAGMA cache_size = -65536;")
+        await conn.execute("PRAGMA mmap_size = 268435456;")
+        await conn.execute("PRAGMA busy_timeout = 5000;")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    async def connect(self) -> None:
+        self._pool = SQLiteConnectionPool(self._connection_factory, pool_size=self.pool_size)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with self._pool.connection() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.execute("ROLLBACK")
+                raise
+            await conn.execute("COMMIT")
+
+    async def init_schema(self) -> None:
+        assert self._pool is not None
+        async with self._pool.connection() as conn:
+            await conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                  id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  started_at TEXT NOT NULL,
+                  ended_at TEXT,
+                  status TEXT NOT NULL CHECK(status IN ('running','completed','error'))
+                );
+
+                CREATE TABLE IF NOT EXISTS sensor_readings (
+                  id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+                  sensor_type TEXT NOT NULL,
+                  timestamp TEXT NOT NULL,
+                  value REAL NOT NULL,
+                  unit TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS actuator_commands (
+                  id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+                  actuator_type TEXT NOT NULL,
+                  timestamp TEXT NOT NULL,
+                  command REAL NOT NULL,
+                  status TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS events (
+                  id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+                  timestamp TEXT NOT NULL,
+                  event_type TEXT NOT NULL,
+                  severity TEXT NOT NULL CHECK(severity IN ('info','warning','error')),
+                  message TEXT NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_sensor_sid_type_ts
+                  ON sensor_readings(session_id, sensor_type, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_act_sid_type_ts
+                  ON actuator_commands(session_id, actuator_type, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_events_sid_sev_ts
+                  ON events(session_id, severity, timestamp);
+
+                -- листинги без фильтра по типу: порядок (timestamp, id) прямо из индекса
+                CREATE INDEX IF NOT EXISTS idx_sensor_sid_ts
+                  ON sensor_readings(session_id, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_act_sid_ts
+                  ON actuator_commands(session_id, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_events_sid_ts
+                  ON events(session_id, timestamp);
+            """)
+            cur = await conn.execute("SELECT id FROM sessions WHERE status='running'")
+            self._open_sessions = {row["id"] for row in await cur.fetchall()}
+
+    async def create_session(self) -> int:
+        async with self._pool.connection() as conn:
+            cur = await conn.execute(
+                f"INSERT INTO sessions(started_at, status) VALUES ({_NOW},?)",
+                ("running",)
+            )
+        self._open_sessions.add(cur.lastrowid)
         return cur.lastrowid
 
-    def get_session(self, session_id: int) -> Optional[Dict[str, Any]]:
-        cur = self._conn.execute("SELECT * FROM sessions WHERE id=?", (session_id,))
-        row = cur.fetchone()
+    async def is_session_open(self, session_id: int) -> bool:
+        if session_id in self._open_sessions:
+            return True
+        # промах — сессию мог открыть другой процесс с той же БД, сверяемся с таблицей
+        while True:
+            ended_count = self._ended_count
+            session = await self.get_session(session_id)
+            if not session or session["status"] != "running":
+                return False
+            if ended_count == self._ended_count:
+                self._open_sessions.add(session_id)
+                return True
+
+    async def get_session(self, session_id: int) -> Optional[Dict[str, Any]]:
+        async with self._pool.connection() as conn:
+            cur = await conn.execute("SELECT * FROM sessions WHERE id=?", (session_id,))
+            row = await cur.fetchone()
         return dict(row) if row else None
 
-    def list_sessions(self, limit: int = 100) -> List[Dict[str, Any]]:
-        cur = self._conn.execute(
-            "SELECT * FROM sessions ORDER BY started_at DESC LIMIT ?", (limit,))
-        return [dict(row) for row in cur.fetchall()]
+    async def list_sessions(self, limit: int = 100) -> List[Dict[str, Any]]:
+        async with self._pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT * FROM sessions ORDER BY started_at DESC LIMIT ?", (limit,))
+            rows = await cur.fetchall()
+        return [dict(row) for row in rows]
 
-    def end_session(self, session_id: int, status: str = "completed") -> None:
-        ts = datetime.utcnow().isoformat()
-        self._conn.execute(
-            "UPDATE sessions SET ended_at=?, status=? WHERE id=?",
-            (ts, status, session_id)
-        )
-        self._conn.commit()
+    async def end_session(self, session_id: int, status: str = "completed") -> None:
+        async with self._pool.connection() as conn:
+            await conn.execute(
+                f"UPDATE sessions SET ended_at={_NOW}, status=? WHERE id=?",
+                (status, session_id)
+            )
+        self._open_sessions.discard(session_id)
+        self._ended_count += 1
 
     # остальные методы без изменений
-    def log_sensor(self, session_id: int, sensor_type: str, value: float, unit: str = "") -> None:
-        ts = datetime.utcnow().isoformat()
-        self._conn.execute(
-            "INSERT INTO sensor_readings(session_id, sensor_type, timestamp, value, unit) VALUES (?,?,?,?,?)",
-            (session_id, sensor_type, ts, value, unit)
-        )
-        self._conn.commit()
+    async def log_sensor(self, session_id: int, sensor_type: str, value: float, unit: str = "") -> None:
+        async with self._pool.connection() as conn:
+            await conn.execute(_INS_SENSOR, (session_id, sensor_type, value, unit))
+
+    async def log_command(self, session_id: int, actuator_type: str, command: float, status: str = "sent") -> None:
+        async with self._pool.connection() as conn:
+            await conn.execute(_INS_CMD, (session_id, actuator_type, command, status))
 
-    def log_command(self, session_id: int, actuator_type: str, command: float, status: str = "sent") -> None:
-        ts = datetime.utcnow().isoformat()
-        self._conn.execute(
-            "INSERT INTO actuator_commands(session_id, actuator_type, timestamp, command, status) VALUES (?,?,?,?,?)",
-            (session_id, actuator_type, ts, command, status)
+    async def log_event(self, session_id: int, event_type: str, severity: str, message: str) -> None:
+        async with self._pool.connection() as conn:
+            await conn.execute(_INS_EVENT, (session_id, event_type, severity, message))
+
+    @staticmethod
+    async def _insert_sensors(conn: aiosqlite.Connection, session_id: int,
+                              rows: List[Tuple[str, float, str]]) -> None:
+        await conn.executemany(
+            _INS_SENSOR,
+            [(session_id, sensor_type, value, unit) for sensor_type, value, unit in rows]
         )
-        self._conn.commit()
 
-    def log_event(self, session_id: int, event_type: str, severity: str, message: str) -> None:
-        ts = datetime.utcnow().isoformat()
-        self._conn.execute(
-            "INSERT INTO events(session_id, timestamp, event_type, severity, message) VALUES (?,?,?,?,?)",
-            (session_id, ts, event_type, severity, message)
+    @staticmethod
+    async def _insert_commands(conn: aiosqlite.Connection, session_id: int,
+                               rows: List[Tuple[str, float, str]]) -> None:
+        await conn.executemany(
+            _INS_CMD,
+            [(session_id, actuator_type, command, status) for actuator_type, command, status in rows]
         )
-        self._conn.commit()
 
-    def sensor_stats(self, session_id: int, sensor_type: str) -> Optional[Dict[str, Any]]:
-        cur = self._conn.execute(
-            "SELECT COUNT(*) AS count, AVG(value) AS avg, MIN(value) AS min, MAX(value) AS max "
-            "FROM sensor_readings WHERE session_id=? AND sensor_type=?",
-            (session_id, sensor_type)
+    @staticmethod
+    async def _insert_events(conn: aiosqlite.Connection, session_id: int,
+                             rows: List[Tuple[str, str, str]]) -> None:
+        await conn.executemany(
+            _INS_EVENT,
+            [(session_id, event_type, severity, message) for event_type, severity, message in rows]
         )
-        row = cur.fetchone()
+
+    async def log_sensors_bulk(self, session_id: int, rows: List[Tuple[str, float, str]]) -> None:
+        async with self.transaction() as conn:
+            await self._insert_sensors(conn, session_id, rows)
+
+    async def log_commands_bulk(self, session_id: int, rows: List[Tuple[str, float, str]]) -> None:
+        async with self.transaction() as conn:
+            await self._insert_commands(conn, session_id, rows)
+
+    async def log_events_bulk(self, session_id: int, rows: List[Tuple[str, str, str]]) -> None:
+        async with self.transaction() as conn:
+            await self._insert_events(conn, session_id, rows)
+
+    async def log_telemetry_batch(self, session_id: int,
+                                  sensors: List[Tuple[str, float, str]],
+                                  commands: List[Tuple[str, float, str]],
+                                  events: List[Tuple[str, str, str]]) -> None:
+        # все три вставки в одной транзакции: один commit на весь пакет
+        async with self.transaction() as conn:
+            await self._insert_sensors(conn, session_id, sensors)
+            await self._insert_commands(conn, session_id, commands)
+            await self._insert_events(conn, session_id, events)
+
+    async def sensor_stats(self, session_id: int, sensor_type: str) -> Optional[Dict[str, Any]]:
+        async with self._pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT COUNT(*) AS count, AVG(value) AS avg, MIN(value) AS min, MAX(value) AS max "
+                "FROM sensor_readings WHERE session_id=? AND sensor_type=?",
+                (session_id, sensor_type)
+            )
+            row = await cur.fetchone()
         return dict(row) if row and row["count"] > 0 else None
 
-    def list_events(self, session_id: int, severity: Optional[str] = None) -> List[Dict[str, Any]]:
-        if severity:
-            cur = self._conn.execute(
-                "SELECT * FROM events WHERE session_id=? AND severity=? ORDER BY timestamp",
-                (session_id, severity)
+    async def sensor_stats_all(self, session_id: int) -> List[Dict[str, Any]]:
+        async with self._pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT sensor_type, COUNT(*) AS count, AVG(value) AS avg, MIN(value) AS min, MAX(value) AS max "
+                "FROM sensor_readings WHERE session_id=? GROUP BY sensor_type ORDER BY sensor_type",
+                (session_id,)
             )
-        else:
-            cur = self._conn.execute(
-                "SELECT * FROM events WHERE session_id=? ORDER BY timestamp", (session_id,)
+            rows = await cur.fetchall()
+        return [dict(row) for row in rows]
+
+    async def _fetch_page(self, sql: str, params: tuple) -> Dict[str, Any]:
+        # строки уходят кортежами без dict() на каждую; имена колонок — один раз.
+        # Соединение возвращается в пул до того, как ответ начнёт уходить клиенту
+        async with self._pool.connection() as conn:
+            cur = await conn.execute(sql, params)
+            cur.row_factory = None
+            rows = await cur.fetchall()
+            columns = [d[0] for d in cur.description]
+        return {"columns": columns, "rows": rows}
+
+    async def list_events(self, session_id: int, severity: Optional[str] = None,
+                          limit: int = 500, offset: int = 0) -> Dict[str, Any]:
+        if severity:
+            return await self._fetch_page(
+                "SELECT * FROM events WHERE session_id=? AND severity=? "
+                "ORDER BY timestamp, id LIMIT ? OFFSET ?",
+                (session_id, severity, limit, offset)
             )
-        return [dict(row) for row in cur.fetchall()]
+        return await self._fetch_page(
+            "SELECT * FROM events WHERE session_id=? ORDER BY timestamp, id LIMIT ? OFFSET ?",
+            (session_id, limit, offset)
+        )
 
-    def list_sensor_readings(self, session_id: int, sensor_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def list_sensor_readings(self, session_id: int, sensor_type: Optional[str] = None,
+                                   limit: int = 500, offset: int = 0) -> Dict[str, Any]:
         if sensor_type:
-            cur = self._conn.execute(
-                "SELECT id, sensor_type, timestamp, value, unit FROM sensor_readings "
-                "WHERE session_id=? AND sensor_type=? ORDER BY timestamp",
-                (session_id, sensor_type)
-            )
-        else:
-            cur = self._conn.execute(
+            return await self._fetch_page(
                 "SELECT id, sensor_type, timestamp, value, unit FROM sensor_readings "
-                "WHERE session_id=? ORDER BY timestamp", (session_id,)
+                "WHERE session_id=? AND sensor_type=? ORDER BY timestamp, id LIMIT ? OFFSET ?",
+                (session_id, sensor_type, limit, offset)
             )
-        return [dict(row) for row in cur.fetchall()]
+        return await self._fetch_page(
+            "SELECT id, sensor_type, timestamp, value, unit FROM sensor_readings "
+            "WHERE session_id=? ORDER BY timestamp, id LIMIT ? OFFSET ?",
+            (session_id, limit, offset)
+        )
 
-    def list_actuator_commands(self, session_id: int, actuator_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def list_actuator_commands(self, session_id: int, actuator_type: Optional[str] = None,
+                                     limit: int = 500, offset: int = 0) -> Dict[str, Any]:
         if actuator_type:
-            cur = self._conn.execute(
+            return await self._fetch_page(
                 "SELECT id, actuator_type, timestamp, command, status FROM actuator_commands "
-                "WHERE session_id=? AND actuator_type=? ORDER BY timestamp",
-                (session_id, actuator_type)
+                "WHERE session_id=? AND actuator_type=? ORDER BY timestamp, id LIMIT ? OFFSET ?",
+                (session_id, actuator_type, limit, offset)
             )
-        else:
-            cur = self._conn.execute(
-                "SELECT id, actuator_type, timestamp, command, status FROM actuator_commands "
-                "WHERE session_id=? ORDER BY timestamp", (session_id,)
-            )
-        return [dict(row) for row in cur.fetchall()]
+        return await self._fetch_page(
+            "SELECT id, actuator_type, timestamp, command, status FROM actuator_commands "
+            "WHERE session_id=? ORDER BY timestamp, id LIMIT ? OFFSET ?",
+            (session_id, limit, offset)
+        )
 
 db = TelemetryLogger()
\ No newline at end of file
@@ -1,5 +1,9 @@
+import sqlite3
+from contextlib import contextmanager
+import orjson
 from fastapi import FastAPI, HTTPException, Query
-from typing import Optional, List
+from fastapi.responses import JSONResponse
+from typing import Any, Optional, List
 from models import *
 from database import db
 
@@ -11,12 +15,32 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup():
-    db.connect()
-    db.init_schema()
+    await db.connect()
+    await db.init_schema()
 
 @app.on_event("shutdown")
 async def shutdown():
-    db.close()
+    await db.close()
+
+class OrjsonResponse(JSONResponse):
+    # списки строк из БД возвращаются как готовый ответ: FastAPI не гоняет их через
+    # jsonable_encoder и валидацию response_model, он остаётся только для документации
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+async def require_open_session(session_id: int) -> None:
+    # телеметрию принимаем только в открытые сессии; проверка идёт по кэшу в db
+    if not await db.is_session_open(session_id):
+        raise HTTPException(404, "Session not found or already ended")
+
+@contextmanager
+def session_must_exist():
+    # страховка на случай устаревшего кэша: запись в сессию, которой уже нет
+    # в таблице, отбивает внешний ключ на sessions(id)
+    try:
+        yield
+    except sqlite3.IntegrityError:
+        raise HTTPException(404, "Session not found")
 
 @app.get("/health")
 async def health(): 
@@ -25,75 +49,118 @@ async def health():
 # === СЕССИИ ===
 @app.post("/sessions", response_model=SessionResponse, status_code=201)
 async def create_session():
-    session_id = db.create_session()
-    return db.get_session(session_id)
+    session_id = await db.create_session()
+    return await db.get_session(session_id)
 
-@app.get("/sessions", response_model=List[SessionResponse])
+@app.get("/sessions", response_model=List[SessionResponse], response_class=OrjsonResponse)
 async def list_sessions(limit: int = Query(100, ge=1, le=1000)):
-    return db.list_sessions(limit)
+    return OrjsonResponse(await db.list_sessions(limit))
 
 @app.get("/sessions/{session_id}", response_model=SessionResponse)
 async def get_session(session_id: int):
-    session = db.get_session(session_id)
+    session = await db.get_session(session_id)
     if not session: 
         raise HTTPException(404, "Session not found")
     return session
 
 @app.post("/sessions/{session_id}/end", response_model=SessionResponse)
 async def end_session(session_id: int, payload: SessionEnd):
-    session = db.get_session(session_id)
+    session = await db.get_session(session_id)
     if not session: 
         raise HTTPException(404, "Session not found")
     if session["status"] != "running":
         raise HTTPException(400, "Session already ended")
-    db.end_session(session_id, payload.status)
-    return db.get_session(session_id)
+    await db.end_session(session_id, payload.status)
+    return await db.get_session(session_id)
 
 # Остальные эндпоинты без изменений
 @app.post("/sessions/{session_id}/sensors", status_code=201)
 async def log_sensor(session_id: int, payload: SensorReading):
-    if not db.get_session(session_id):
-        raise HTTPException(404, "Session not found")
-    db.log_sensor(session_id, payload.sensor_type, payload.value, payload.unit)
+    await require_open_session(session_id)
+    with session_must_exist():
+        await db.log_sensor(session_id, payload.sensor_type, payload.value, payload.unit)
     return {"detail": "logged"}
 
 @app.post("/sessions/{session_id}/actuators", status_code=201)
 async def log_actuator(session_id: int, payload: ActuatorCommand):
-    if not db.get_session(session_id):
-        raise HTTPException(404, "Session not found")
-    db.log_command(session_id, payload.actuator_type, payload.command, payload.status)
+    await require_open_session(session_id)
+    with session_must_exist():
+        await db.log_command(session_id, payload.actuator_type, payload.command, payload.status)
     return {"detail": "logged"}
 
 @app.post("/sessions/{session_id}/events", status_code=201)
 async def log_event(session_id: int, payload: EventLog):
-    if not db.get_session(session_id):
-        raise HTTPException(404, "Session not found")
-    db.log_event(session_id, payload.event_type, payload.severity, payload.message)
+    await require_open_session(session_id)
+    with session_must_exist():
+        await db.log_event(session_id, payload.event_type, payload.severity, payload.message)
     return {"detail": "logged"}
 
+@app.post("/sessions/{session_id}/sensors/bulk", status_code=201)
+async def log_sensors_bulk(session_id: int, payload: List[SensorReading]):
+    await require_open_session(session_id)
+    with session_must_exist():
+        await db.log_sensors_bulk(session_id, [(r.sensor_type, r.value, r.unit) for r in payload])
+    return {"detail": "logged", "count": len(payload)}
+
+@app.post("/sessions/{session_id}/actuators/bulk", status_code=201)
+async def log_actuators_bulk(session_id: int, payload: List[ActuatorCommand]):
+    await require_open_session(session_id)
+    with session_must_exist():
+        await db.log_commands_bulk(session_id, [(c.actuator_type, c.command, c.status) for c in payload])
+    return {"detail": "logged", "count": len(payload)}
+
+@app.post("/sessions/{session_id}/events/bulk", status_code=201)
+async def log_events_bulk(session_id: int, payload: List[EventLog]):
+    await require_open_session(session_id)
+    with session_must_exist():
+        await db.log_events_bulk(session_id, [(e.event_type, e.severity, e.message) for e in payload])
+    return {"detail": "logged", "count": len(payload)}
+
+@app.post("/sessions/{session_id}/telemetry/batch", status_code=201)
+async def log_telemetry_batch(session_id: int, payload: TelemetryBatch):
+    await require_open_session(session_id)
+    with session_must_exist():
+        await db.log_telemetry_batch(
+            session_id,
+            [(r.sensor_type, r.value, r.unit) for r in payload.sensors],
+            [(c.actuator_type, c.command, c.status) for c in payload.actuators],
+            [(e.event_type, e.severity, e.message) for e in payload.events],
+        )
+    return {"detail": "logged",
+            "count": len(payload.sensors) + len(payload.actuators) + len(payload.events)}
+
 @app.get("/sessions/{session_id}/sensors/{sensor_type}/stats", response_model=SensorStatsResponse)
 async def sensor_stats(session_id: int, sensor_type: str):
-    if not db.get_session(session_id):
+    if not await db.get_session(session_id):
         raise HTTPException(404, "Session not found")
-    stats = db.sensor_stats(session_id, sensor_type)
+    stats = await db.sensor_stats(session_id, sensor_type)
     if not stats:
         raise HTTPException(404, f"No data for sensor {sensor_type}")
     return stats
 
-@app.get("/sessions/{session_id}/events", response_model=List[EventResponse])
-async def get_events(session_id: int, severity: Optional[str] = None):
-    if not db.get_session(session_id):
+@app.get("/sessions/{session_id}/sensors/stats", response_model=List[SensorTypeStatsResponse])
+async def sensor_stats_all(session_id: int):
+    if not await db.get_session(session_id):
+        raise HTTPException(404, "Session not found")
+    return await db.sensor_stats_all(session_id)
+
+@app.get("/sessions/{session_id}/events", response_model=RowsPage, response_class=OrjsonResponse)
+async def get_events(session_id: int, severity: Optional[str] = None,
+                     limit: int = Query(500, ge=1, le=10000), offset: int = Query(0, ge=0)):
+    if not await db.get_session(session_id):
         raise HTTPException(404, "Session not found")
-    return db.list_events(session_id, severity)
+    return OrjsonResponse(await db.list_events(session_id, severity, limit, offset))
 
-@app.get("/sessions/{session_id}/sensors", response_model=List[SensorReadingResponse])
-async def list_sensors(session_id: int, sensor_type: Optional[str] = None):
-    if not db.get_session(session_id):
+@app.get("/sessions/{session_id}/sensors", response_model=RowsPage, response_class=OrjsonResponse)
+async def list_sensors(session_id: int, sensor_type: Optional[str] = None,
+                       limit: int = Query(500, ge=1, le=10000), offset: int = Query(0, ge=0)):
+    if not await db.get_session(session_id):
         raise HTTPException(404, "Session not found")
-    return db.list_sensor_readings(session_id, sensor_type)
+    return OrjsonResponse(await db.list_sensor_readings(session_id, sensor_type, limit, offset))
 
-@app.get("/sessions/{session_id}/actuators", response_model=List[ActuatorCommandResponse])
-async def list_actuators(session_id: int, actuator_type: Optional[str] = None):
-    if not db.get_session(session_id):
+@app.get("/sessions/{session_id}/actuators", response_model=RowsPage, response_class=OrjsonResponse)
+async def list_actuators(session_id: int, actuator_type: Optional[str] = None,
+                         limit: int = Query(500, ge=1, le=10000), offset: int = Query(0, ge=0)):
+    if not await db.get_session(session_id):
         raise HTTPException(404, "Session not found")
-    return db.list_actuator_commands(session_id, actuator_type)
\ No newline at end of file
+    return OrjsonResponse(await db.list_actuator_commands(session_id, actuator_type, limit, offset))
\ No newline at end of file
@@ -1,54 +1,48 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, List
+from typing import Any, Optional, Literal, List
 
 class SessionEnd(BaseModel):
-    status: Literal["completed", "error"] = Field("completed", example="completed")
+    status: Literal["completed", "error"] = Field("completed", examples=["completed"])
 
 class SensorReading(BaseModel):
-    sensor_type: str = Field(..., min_length=1, max_length=50, example="pressure")
-    value: float = Field(..., example=68.4)
-    unit: str = Field("", max_length=20, example="bar")
+    sensor_type: str = Field(..., min_length=1, max_length=50, examples=["pressure"])
+    value: float = Field(..., examples=[68.4])
+    unit: str = Field("", max_length=20, examples=["bar"])
 
 class ActuatorCommand(BaseModel):
-    actuator_type: str = Field(..., min_length=1, max_length=50, example="movement")
-    command: float = Field(..., example=1.0)
-    status: str = Field("sent", max_length=50, example="ВПРАВО → (3,2)")
+    actuator_type: str = Field(..., min_length=1, max_length=50, examples=["movement"])
+    command: float = Field(..., examples=[1.0])
+    status: str = Field("sent", max_length=50, examples=["ВПРАВО → (3,2)"])
 
 class EventLog(BaseModel):
-    event_type: str = Field(..., min_length=1, max_length=50, example="leak_detected")
-    severity: Literal["info", "warning", "error"] = Field(..., example="error")
-    message: str = Field(..., min_length=1, max_length=500, example="УТЕЧКА в точке (4,2): 32.1 бар")
+    event_type: str = Field(..., min_length=1, max_length=50, examples=["leak_detected"])
+    severity: Literal["info", "warning", "error"] = Field(..., examples=["error"])
+    message: str = Field(..., min_length=1, max_length=500, examples=["УТЕЧКА в точке (4,2): 32.1 бар"])
+
+class TelemetryBatch(BaseModel):
+    sensors: List[SensorReading] = []
+    actuators: List[ActuatorCommand] = []
+    events: List[EventLog] = []
 
 class SessionResponse(BaseModel):
-    id: int = Field(..., example=42)
-    started_at: str = Field(..., example="2025-04-05T12:34:56.789")
+    id: int = Field(..., examples=[42])
+    started_at: str = Field(..., examples=["2025-04-05T12:34:56.789"])
     ended_at: Optional[str] = None
-    status: str = Field(..., example="running")
+    status: str = Field(..., examples=["running"])
 
 class SensorStatsResponse(BaseModel):
-    count: int = Field(..., example=15)
-    avg: Optional[float] = Field(None, example=98.7)
-    min: Optional[float] = Field(None, example=45.2)
-    max: Optional[float] = Field(None, example=178.9)
-
-class EventResponse(BaseModel):
-    id: int
-    session_id: int
-    timestamp: str
-    event_type: str
-    severity: str
-    message: str
-
-class SensorReadingResponse(BaseModel):
-    id: int
-    sensor_type: str
-    timestamp: str
-    value: float
-    unit: Optional[str]
-
-class ActuatorCommandResponse(BaseModel):
-    id: int
-    actuator_type: str
-    timestamp: str
-    command: float
-    status: Optional[str]
\ No newline at end of file
+    count: int = Field(..., examples=[15])
+    avg: Optional[float] = Field(None, examples=[98.7])
+    min: Optional[float] = Field(None, examples=[45.2])
+    max: Optional[float] = Field(None, examples=[178.9])
+
+class SensorTypeStatsResponse(BaseModel):
+    sensor_type: str = Field(..., examples=["pressure"])
+    count: int = Field(..., examples=[15])
+    avg: Optional[float] = Field(None, examples=[98.7])
+    min: Optional[float] = Field(None, examples=[45.2])
+    max: Optional[float] = Field(None, examples=[178.9])
+
+class RowsPage(BaseModel):
+    columns: List[str] = Field(..., examples=[["id", "sensor_type", "timestamp", "value", "unit"]])
+    rows: List[List[Any]] = Field(..., examples=[[[1, "pressure", "2025-04-05T12:34:56.789", 68.4, "bar"]]])
\ No newline at end of file
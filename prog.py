@@ -1,12 +1,14 @@
+import argparse
+import asyncio
 import random
-import requests
-from typing import List, Tuple, Optional
-from dataclasses import dataclass
+from collections import deque
+from contextlib import AsyncExitStack
+import httpx
+from typing import Dict, List, Tuple, Optional
 from enum import Enum
 
 BASE_URL = "http://127.0.0.1:8000"
 
-
 class Direction(Enum):
     UP = "ВВЕРХ"
     DOWN = "ВНИЗ"
@@ -21,19 +23,12 @@ class PressureStatus(Enum):
     HIGH = "ВЫСОКОЕ"
 
 
-@dataclass
-class PipePoint:
-    x: int
-    y: int
-
-    def __str__(self):
-        return f"({self.x},{self.y})"
+# точка трубы — просто кортеж (x, y): без объекта и собственного __hash__ на каждую клетку
+PipePoint = Tuple[int, int]
 
-    def __hash__(self):
-        return hash((self.x, self.y))
 
-    def __eq__(self, other):
-        return isinstance(other, PipePoint) and self.x == other.x and self.y == other.y
+def point_str(p: PipePoint) -> str:
+    return f"({p[0]},{p[1]})"
 
 
 class PressureSensor:
@@ -67,10 +62,17 @@ class PressureSensor:
 
 
 class Crawler:
+    _DIRECTIONS = {
+        (1, 0): Direction.RIGHT,
+        (-1, 0): Direction.LEFT,
+        (0, 1): Direction.DOWN,
+        (0, -1): Direction.UP,
+    }
+
     def __init__(self):
         self.current_position: Optional[PipePoint] = None
 
-    def move_to(self, target: PipePoint, session_id: int) -> Direction:
+    def move_to(self, target: PipePoint) -> Dict[str, list]:
         if self.current_position is None:
             direction = Direction.UNKNOWN
             self.current_position = target
@@ -78,33 +80,27 @@ class Crawler:
             direction = self._get_direction(self.current_position, target)
             self.current_position = target
 
-        # логируем координаты
-        requests.post(f"{BASE_URL}/sessions/{session_id}/sensors",
-                      json={"sensor_type": "position_x", "value": float(target.x), "unit": "cell"})
-        requests.post(f"{BASE_URL}/sessions/{session_id}/sensors",
-                      json={"sensor_type": "position_y", "value": float(target.y), "unit": "cell"})
+        # координаты
+        x, y = target
+        sensors = [
+            {"sensor_type": "position_x", "value": float(x), "unit": "cell"},
+            {"sensor_type": "position_y", "value": float(y), "unit": "cell"},
+        ]
 
         # команда движения
-        requests.post(f"{BASE_URL}/sessions/{session_id}/actuators",
-                      json={"actuator_type": "movement", "command": 1.0,
-                            "status": f"{direction.value} → {target}"})
+        actuators = [{"actuator_type": "movement", "command": 1.0,
+                      "status": f"{direction.value} → {point_str(target)}"}]
 
         if direction != Direction.UNKNOWN:
-            requests.post(f"{BASE_URL}/sessions/{session_id}/actuators",
-                          json={"actuator_type": f"dir_{direction.name.lower()}",
-                                "command": 1.0, "status": "executed"})
+            actuators.append({"actuator_type": f"dir_{direction.name.lower()}",
+                              "command": 1.0, "status": "executed"})
 
-        print(f"Перемещение: {direction.value} → {target}")
-        return direction
+        print(f"Перемещение: {direction.value} → {point_str(target)}")
+        # телеметрию отправляет контроллер одним пакетом вместе с замером давления
+        return {"sensors": sensors, "actuators": actuators, "events": []}
 
     def _get_direction(self, fr: PipePoint, to: PipePoint) -> Direction:
-        dx = to.x - fr.x
-        dy = to.y - fr.y
-        if dx == 1 and dy == 0: return Direction.RIGHT
-        if dx == -1 and dy == 0: return Direction.LEFT
-        if dy == 1 and dx == 0: return Direction.DOWN
-        if dy == -1 and dx == 0: return Direction.UP
-        return Direction.UNKNOWN
+        return self._DIRECTIONS.get((to[0] - fr[0], to[1] - fr[1]), Direction.UNKNOWN)
 
 
 class PipeMap:
@@ -112,92 +108,133 @@ class PipeMap:
         self.map_data = map_data
         self.width = len(map_data[0]) if map_data else 0
         self.height = len(map_data)
+        # плоская битовая карта: grid[y * width + x] == 1 для клеток трубы
+        self.grid = bytearray(c == 'X' for row in map_data for c in row)
+        # список точек считается один раз; обход идёт построчно, поэтому первая точка — левая верхняя
+        w = self.width
+        self._all_points: Tuple[PipePoint, ...] = tuple(
+            (i % w, i // w) for i, cell in enumerate(self.grid) if cell)
+        self._min_point: Optional[PipePoint] = self._all_points[0] if self._all_points else None
+
+    def index(self, p: PipePoint) -> int:
+        return p[1] * self.width + p[0]
 
-    def is_pipe_point(self, p: PipePoint) -> bool:
-        return (0 <= p.x < self.width and 0 <= p.y < self.height and self.map_data[p.y][p.x] == 'X')
+    def get_all_pipe_points(self) -> Tuple[PipePoint, ...]:
+        return self._all_points
 
-    def get_all_pipe_points(self) -> List[PipePoint]:
-        return [PipePoint(x, y) for y in range(self.height) for x in range(self.width)
-                if self.is_pipe_point(PipePoint(x, y))]
+    def get_start_point(self) -> Optional[PipePoint]:
+        return self._min_point
 
     def get_neighbors(self, p: PipePoint) -> List[PipePoint]:
-        neighbors = []
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            np = PipePoint(p.x + dx, p.y + dy)
-            if self.is_pipe_point(np):
-                neighbors.append(np)
-        return neighbors
+        w = self.width
+        return [(i % w, i // w) for i in self.get_neighbor_ids(self.index(p))]
+
+    def get_neighbor_ids(self, i: int) -> List[int]:
+        # соседи клетки-трубы по индексам y * width + x в порядке: вниз, вправо, вверх, влево
+        w, grid = self.width, self.grid
+        x = i % w
+        ids = []
+        if i + w < len(grid) and grid[i + w]:
+            ids.append(i + w)
+        if x + 1 < w and grid[i + 1]:
+            ids.append(i + 1)
+        if i >= w and grid[i - w]:
+            ids.append(i - w)
+        if x > 0 and grid[i - 1]:
+            ids.append(i - 1)
+        return ids
 
 
 class InspectionController:
-    def __init__(self, sensor: PressureSensor, crawler: Crawler, pipe_map: PipeMap):
+    def __init__(self, sensor: PressureSensor, crawler: Crawler, pipe_map: PipeMap,
+                 client: httpx.AsyncClient):
         self.sensor = sensor
         self.crawler = crawler
         self.pipe_map = pipe_map
-        self.inspected = set()
+        self.client = client
+        self.inspected = bytearray(len(pipe_map.grid))
         self.leaks = []
+        self.failed_posts = 0
 
-    def inspect_point(self, point: PipePoint, session_id: int):
-        if point in self.inspected:
-            return
-        self.inspected.add(point)
+    def inspect_point(self, point: PipePoint) -> Optional[Dict[str, list]]:
+        i = self.pipe_map.index(point)
+        if self.inspected[i]:
+            return None
+        self.inspected[i] = 1
 
-        self.crawler.move_to(point, session_id)
+        batch = self.crawler.move_to(point)
         pressure = self.sensor.read_pressure()
         status = self.sensor.get_pressure_status(pressure)
 
-        requests.post(f"{BASE_URL}/sessions/{session_id}/sensors",
-                      json={"sensor_type": "pressure", "value": pressure, "unit": "bar"})
+        batch["sensors"].append({"sensor_type": "pressure", "value": pressure, "unit": "bar"})
 
-        requests.post(f"{BASE_URL}/sessions/{session_id}/actuators",
-                      json={"actuator_type": "pressure_status",
-                            "command": 1.0 if status == PressureStatus.NORMAL else 0.0,
-                            "status": status.value})
+        batch["actuators"].append({"actuator_type": "pressure_status",
+                                   "command": 1.0 if status == PressureStatus.NORMAL else 0.0,
+                                   "status": status.value})
 
         if status == PressureStatus.LEAK:
             self.leaks.append((point, pressure))
-            requests.post(f"{BASE_URL}/sessions/{session_id}/events", json={
+            batch["events"].append({
                 "event_type": "leak_detected",
                 "severity": "error",
-                "message": f"УТЕЧКА в точке {point}: {pressure} бар (норма 50–120)"
+                "message": f"УТЕЧКА в точке {point_str(point)}: {pressure} бар (норма 50–120)"
             })
         elif status == PressureStatus.HIGH:
-            requests.post(f"{BASE_URL}/sessions/{session_id}/events", json={
+            batch["events"].append({
                 "event_type": "high_pressure",
                 "severity": "warning",
-                "message": f"ВЫСОКОЕ ДАВЛЕНИЕ в {point}: {pressure} бар"
+                "message": f"ВЫСОКОЕ ДАВЛЕНИЕ в {point_str(point)}: {pressure} бар"
             })
 
-        print(f"Проверка {point} → {pressure} бар → {status.value}")
+        print(f"Проверка {point_str(point)} → {pressure} бар → {status.value}")
+        return batch
 
-    def auto_inspect(self, session_id: int):
-        start = min(self.pipe_map.get_all_pipe_points(), key=lambda p: (p.y, p.x))
+    async def _send_batch(self, session_id: int, batch: Optional[Dict[str, list]]):
+        # пакеты отправляются по одному в порядке обхода: метку времени ставит сервер,
+        # и только так журнал перемещений в БД повторяет путь краулера
+        if batch is None:
+            return
+        try:
+            resp = await self.client.post(f"/sessions/{session_id}/telemetry/batch", json=batch)
+            resp.raise_for_status()
+        except httpx.HTTPError as exc:
+            self.failed_posts += 1
+            print(f"Ошибка отправки телеметрии: {exc!r}")
+
+    async def auto_inspect(self, session_id: int):
+        start = self.pipe_map.get_start_point()
         print("\nЗАПУСК ИНСПЕКЦИИ ТРУБОПРОВОДА")
         print("=" * 50)
-        self.inspect_point(start, session_id)
+        await self._send_batch(session_id, self.inspect_point(start))
 
-        stack = self.pipe_map.get_neighbors(start)
-        visited = self.inspected.copy()
+        pipe_map = self.pipe_map
+        w = pipe_map.width
+        start_id = pipe_map.index(start)
+        visited = bytearray(len(pipe_map.grid))
+        visited[start_id] = 1
+        stack = deque(pipe_map.get_neighbor_ids(start_id))
 
         while stack:
-            nxt = stack.pop()
-            if nxt not in visited:
-                visited.add(nxt)
-                self.inspect_point(nxt, session_id)
-                for nb in self.pipe_map.get_neighbors(nxt):
-                    if nb not in visited:
+            i = stack.pop()
+            if not visited[i]:
+                visited[i] = 1
+                await self._send_batch(session_id, self.inspect_point((i % w, i // w)))
+                for nb in pipe_map.get_neighbor_ids(i):
+                    if not visited[nb]:
                         stack.append(nb)
 
     def report(self):
         total = len(self.pipe_map.get_all_pipe_points())
         print("\n" + "=" * 50)
         print("ИНСПЕКЦИЯ ЗАВЕРШЕНА")
-        print(f"Проверено точек: {len(self.inspected)}/{total}")
+        print(f"Проверено точек: {self.inspected.count(1)}/{total}")
         print(f"Обнаружено утечек: {len(self.leaks)}")
+        if self.failed_posts:
+            print(f"Не отправлено пакетов телеметрии: {self.failed_posts}")
         if self.leaks:
             print("\nКРИТИЧЕСКИЕ УЧАСТКИ:")
             for p, pr in self.leaks:
-                print(f"  • {p}: {pr} бар → УТЕЧКА")
+                print(f"  • {point_str(p)}: {pr} бар → УТЕЧКА")
         print("=" * 50)
 
 
@@ -208,7 +245,7 @@ def print_map(pipe_map: PipeMap):
     print()
 
 
-def main():
+async def main(in_process: bool = False):
     map_data = [
         ['X', 'X', 'X', 'X', 'X'],
         ['.', 'X', '.', 'X', '.'],
@@ -221,18 +258,36 @@ def main():
     sensor = PressureSensor(leak_probability=0.45)
     crawler = Crawler()
     sensor.calibrate((50.0, 120.0))
-    controller = InspectionController(sensor, crawler, pipe_map)
-
-    resp = requests.post(f"{BASE_URL}/sessions", json={})
-    session_id = resp.json()["id"]
-    print(f"Сессия #{session_id} создана\n")
-
-    print_map(pipe_map)
-    controller.auto_inspect(session_id)
-    controller.report()
 
-    requests.post(f"{BASE_URL}/sessions/{session_id}/end", json={"status": "completed"})
+    async with AsyncExitStack() as stack:
+        transport = None
+        if in_process:
+            # API в этом же процессе: запросы идут прямо в ASGI-приложение, без сокетов
+            from main import app as api_app
+            await stack.enter_async_context(api_app.router.lifespan_context(api_app))
+            transport = httpx.ASGITransport(app=api_app)
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(base_url=BASE_URL, transport=transport))
+        controller = InspectionController(sensor, crawler, pipe_map, client)
+
+        resp = await client.post("/sessions", json={})
+        session_id = resp.json()["id"]
+        print(f"Сессия #{session_id} создана\n")
+
+        print_map(pipe_map)
+        # сессия закрывается всегда, иначе она навсегда останется running
+        status = "error"
+        try:
+            await controller.auto_inspect(session_id)
+            controller.report()
+            if not controller.failed_posts:
+                status = "completed"
+        finally:
+            await client.post(f"/sessions/{session_id}/end", json={"status": status})
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Инспекция трубопровода")
+    parser.add_argument("--in-process", action="store_true",
+                        help="запустить API в этом же процессе вместо HTTP на BASE_URL")
+    asyncio.run(main(parser.parse_args().in_process))
\ No newline at end of file